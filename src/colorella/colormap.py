@@ -34,6 +34,7 @@ classmethods allow the following functions:
 
 '''''
 import os
+import io
 import json
 import numpy as np
 import matplotlib as mpl
@@ -51,6 +52,27 @@ try:
 except:
     GDAL_INSTALLED = False
 
+# names of the matplotlib colormaps registered at import time
+_MPL_CMAPS = frozenset(plt.colormaps())
+
+# directory of the colormaps shipped with colorella
+CM_DIRPATH = os.path.join(os.path.dirname(__file__), "colormaps")
+# colormap file extensions in the order they are looked up by name
+CM_EXTENSIONS = ('.json', '.cpt', '.ct')
+
+
+def get_user_colormaps():
+    """
+    Lists the colormap files in the colorella colormap directory
+
+    Returns
+    -------
+    list of filenames of all .cpt, .ct and .json files
+    """
+    with os.scandir(CM_DIRPATH) as it:
+        return [e.name for e in it if e.is_file() and e.name.endswith(CM_EXTENSIONS)]
+
+
 class ColorMap:
     """create a colormap object compatible with matplotlib
         """
@@ -62,7 +84,7 @@ class ColorMap:
         Parameters
         ----------
         arg : str
-            defining the input for the colormap, can be one of the following: mpl:Name to load a matplotlib colormap, cc:Name to load a Colorcet colormap, clName to load a Colorella Colormap from json file
+            defining the input for the colormap, can be one of the following: mpl:Name to load a matplotlib colormap, cc:Name to load a Colorcet colormap, cl:Name to load a Colorella Colormap from a .json, .cpt or .ct file in the colormap directory
         """
         self.arg = arg
 
@@ -71,17 +93,18 @@ class ColorMap:
         elif isinstance(self.arg, str):
             pkg_name, cm_name = arg.split(':')
             if pkg_name == "mpl":
-                if cm_name not in plt.colormaps():
+                # colormaps registered after import are only found through the slower registry lookup
+                if cm_name not in _MPL_CMAPS and cm_name not in plt.colormaps():
                     raise ValueError('Input provided {0} is not a Matplotlib Colormap'.format(
                 cm_name))
                 self._mpl_cm = cm.get_cmap(cm_name)
             elif pkg_name == "cl":
-                cm_filepath = os.path.join(os.path.dirname(__file__), "colormaps", cm_name + ".json")
-                name, colors, gradient = json2list(cm_filepath)
-                if not gradient:
-                    self._mpl_cm = col.ListedColormap(colors=colors, name=name)
-                else:
-                    self._mpl_cm = col.LinearSegmentedColormap(segmentdata=colors, name=name)
+                cm_filepath = os.path.join(CM_DIRPATH, cm_name + ".json")
+                for ext in CM_EXTENSIONS:
+                    if os.path.isfile(os.path.join(CM_DIRPATH, cm_name + ext)):
+                        cm_filepath = os.path.join(CM_DIRPATH, cm_name + ext)
+                        break
+                self._mpl_cm = ColorMap.from_file(cm_filepath)._mpl_cm
             elif pkg_name == 'cc':
                 if cm_name not in cc.cm:
                     raise ValueError('Input provided {0} is not a Colorcet Colormap'.format(
@@ -290,7 +313,7 @@ class ColorMap:
         return cls(mpl_cm)
 
     @classmethod
-    def from_list(cls, clist, name='default', gradient=False):
+    def from_list(cls, clist, name='default', gradient=False, N=256):
         """
         Make a linear segmented colormap with *name* from a sequence
         of *colors* which evenly transitions from colors[0] at val=0
@@ -306,6 +329,9 @@ class ColorMap:
             name of the Colormap
         gradient: bool
             if False a Listed Colormap is created, if True a LinearSegmented Colormap is created
+        N: int, optional
+            number of RGB quantization levels of a LinearSegmented Colormap, default = 256.
+            Use len(clist) if the colors do not need to be interpolated
 
         Returns
         -------
@@ -314,12 +340,12 @@ class ColorMap:
         if not gradient:
             mpl_cm = col.ListedColormap(name=name, colors=clist)
         else:
-            mpl_cm = col.LinearSegmentedColormap.from_list(name=name, colors=clist)
+            mpl_cm = col.LinearSegmentedColormap.from_list(name=name, colors=clist, N=N)
         return cls(mpl_cm)
 
     def convert2greyscale(self, weights=1, inplace=True):
         """
-        Return a grayscale version of the given colormap. Luminanance values are calculated using a dot  product of a weight array and the color array of the object
+        Return a grayscale version of the given colormap as Listed Colormap. Luminanance values are calculated using a dot  product of a weight array and the color array of the object
 
         Parameters
         ----------
@@ -333,22 +359,25 @@ class ColorMap:
         ColorMap object if inpalce = False
 
         """
-        colors = self._mpl_cm(np.arange(self._mpl_cm.N))
+        if not self._mpl_cm._isinit:
+            self._mpl_cm._init()
+        # valid LUT rows only, the last three rows hold the under, over and bad colors
+        colors = self._mpl_cm._lut[:-3].astype(np.float32)
 
         if weights == 1:
-            RGB_weights = [0.2126, 0.7152, 0.0722]
-            luminance = np.dot(colors[:, :3], RGB_weights)
+            RGB_weights = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+            luminance = colors[:, :3] @ RGB_weights
         elif weights == 2:
-            RGB_weights = [0.299, 0.587, 0.114]
-            luminance = np.dot(colors[:, :3], RGB_weights)
+            RGB_weights = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+            luminance = colors[:, :3] @ RGB_weights
         elif weights == 3:
-            RGB_weights = [0.299, 0.587, 0.114]
-            luminance = np.sqrt(np.dot(colors[:, :3] ** 2, RGB_weights))
+            RGB_weights = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+            luminance = np.sqrt(colors[:, :3] ** 2 @ RGB_weights)
         else:
             warnings.warn('Argument weight only supports values between 1 and 3')
 
-        colors[:, :3] = luminance[:, np.newaxis]
-        mpl_cm = col.LinearSegmentedColormap.from_list(self._mpl_cm.name +'_grey', colors, self._mpl_cm.N)
+        np.copyto(colors[:, :3], luminance[:, np.newaxis])
+        mpl_cm = col.ListedColormap(colors, name=self._mpl_cm.name + '_grey')
 
         if inplace:
             self._mpl_cm = mpl_cm
@@ -360,7 +389,7 @@ class ColorMap:
         """
         Shows the colormap as a colorbar in a plot
         """
-        colors = self._mpl_cm(np.arange(self._mpl_cm.N))
+        colors = self._mpl_cm(np.arange(self._mpl_cm.N, dtype=np.intp))
         plt.imshow([colors], extent=[0, 10, 0, 1])
         plt.axis('off')
         plt.show()
@@ -380,22 +409,17 @@ class ColorMap:
         """
 
         if isinstance(self._mpl_cm, col.ListedColormap):
-            mpl_cm = col.ListedColormap(self._mpl_cm.colors[::-1])
+            mpl_cm = col.ListedColormap(self._mpl_cm.colors[::-1], name=self._mpl_cm.name + '_reversed')
 
         elif isinstance(self._mpl_cm, col.LinearSegmentedColormap):
-            reverse = []
-            keys = []
-
-            for key in self._mpl_cm._segmentdata:
-                keys.append(key)
-                channel = self._mpl_cm._segmentdata[key]
-                data = []
-
-                for c in channel:
-                    data.append((1 - c[0], c[2], c[1]))
-                reverse.append(sorted(data))
+            revdict = {}
+            for key, seg in self._segment_arrays().items():
+                # walking the points backwards keeps coinciding x values (discontinuities) in the right order
+                rev = seg[::-1, [0, 2, 1]]
+                rev[:, 0] = 1.0 - rev[:, 0]
+                rev = rev[np.argsort(rev[:, 0], kind='stable')]
+                revdict[key] = rev.tolist()
 
-            revdict = dict(zip(keys, reverse))
             mpl_cm = mpl.colors.LinearSegmentedColormap(segmentdata=revdict, name=self._mpl_cm.name + '_reversed')
 
         if inplace:
@@ -404,6 +428,30 @@ class ColorMap:
         else:
             return ColorMap(mpl_cm)
 
+    def _segment_arrays(self):
+        """
+        Returns the segment data of a LinearSegmented Colormap as read-only arrays. The arrays are cached until the
+        matplotlib colormap of the object is replaced. Channels defined by a function (e.g. gnuplot) are sampled at
+        N evenly spaced points, clipped to [0, 1] like matplotlib does when building the lookup table.
+
+        Returns
+        -------
+        dict containing one array of shape (N, 3) with rows of x, y0, y1 per channel
+        """
+        if getattr(self, '_segarr_src', None) is not self._mpl_cm:
+            segarr = {}
+            for key, channel in self._mpl_cm._segmentdata.items():
+                if callable(channel):
+                    x = np.linspace(0., 1., self._mpl_cm.N)
+                    y = np.clip(np.broadcast_to(np.asarray(channel(x), dtype=np.float64), x.shape), 0., 1.)
+                    seg = np.column_stack((x, y, y))
+                else:
+                    seg = np.array(channel, dtype=np.float64)
+                seg.flags.writeable = False
+                segarr[key] = seg
+            self._segarr, self._segarr_src = segarr, self._mpl_cm
+        return self._segarr
+
     def to_matplotlib(self):
         """
         Returns the matplotlib colormap object
@@ -425,18 +473,11 @@ class ColorMap:
 
         """
         if isinstance(self._mpl_cm, col.ListedColormap):
-            col_list = self._mpl_cm._lut
-            red = []
-            green = []
-            blue = []
-            alpha = []
-
-            for i in range(len(col_list)):
-                red.append(col_list[i][0])
-                green.append(col_list[i][1])
-                blue.append(col_list[i][2])
-                alpha.append(col_list[i][3])
-            col_dct = {'R': red, 'G': green, 'B': blue, 'A': alpha}
+            if not self._mpl_cm._isinit:
+                self._mpl_cm._init()
+            lut = self._mpl_cm._lut
+            col_dct = {'R': lut[:, 0].tolist(), 'G': lut[:, 1].tolist(), 'B': lut[:, 2].tolist(),
+                       'A': lut[:, 3].tolist()}
             return col_dct
 
         elif isinstance(self._mpl_cm, col.LinearSegmentedColormap):
@@ -454,13 +495,9 @@ class ColorMap:
             return self._mpl_cm.colors
 
         elif isinstance(self._mpl_cm, col.LinearSegmentedColormap):
-            dic_list = []
-            for key, value in self._mpl_cm._segmentdata.items():
-                temp = [key, value]
-                dic_list.append(temp)
-            return  dic_list
+            return list(map(list, self._mpl_cm._segmentdata.items()))
 
-    def to_gradient(self, inplace=True):
+    def to_gradient(self, inplace=True, N=256):
         """
         Converts a listed Colormap to a Linear Segmented Colormap
 
@@ -470,6 +507,9 @@ class ColorMap:
             filename if the colormap is saved
         inplace: bool
             if True the original object is replaced, if False a new ColorMap object is returned
+        N: int, optional
+            number of RGB quantization levels, default = 256. Use len(self) to keep exactly the listed colors
+            without interpolating between them
 
         Returns
         -------
@@ -479,7 +519,8 @@ class ColorMap:
             warnings.warn("Colormap is already a Segmented Colormap. Listed Colormap required")
             return self
         else:
-            mpl_cm = col.LinearSegmentedColormap.from_list(name=self._mpl_cm.name+'_gradient', colors=self._mpl_cm.colors)
+            mpl_cm = col.LinearSegmentedColormap.from_list(name=self._mpl_cm.name+'_gradient', colors=self._mpl_cm.colors,
+                                                           N=N)
 
         if inplace:
             self._mpl_cm = mpl_cm
@@ -542,20 +583,25 @@ class ColorMap:
         b = np.array(kwargs.get("B", self._mpl_cm(0.)))
         f = np.array(kwargs.get("F", self._mpl_cm(1.)))
         na = np.array(kwargs.get("N", (0, 0, 0))).astype(float)
-        ext = (np.c_[b[:3], f[:3], na[:3]].T * 255).astype(int)
+        ext = np.rint(np.c_[b[:3], f[:3], na[:3]].T * 255).astype(np.uint8)
         # Creating footer
         extstr = "B {:3d} {:3d} {:3d}\nF {:3d} {:3d} {:3d}\nN {:3d} {:3d} {:3d}"
-        footer = extstr.format(*list(ext.flatten()))
+        footer = extstr.format(*ext.flatten().tolist())
         # create colormap
-        colors = (self._mpl_cm(np.linspace(0., 1., N))[:, :3] * 255).astype(int)
-        vals = np.linspace(vmin, vmax, N)
+        steps = np.arange(N, dtype=np.float64) * (1. / (N - 1))
+        rgb = self._mpl_cm(steps)[:, :3]
+        np.multiply(rgb, 255., out=rgb)
+        np.rint(rgb, out=rgb)
+        colors = rgb.astype(np.uint8)
+        vals = steps * (vmax - vmin) + vmin
         col_arr = np.c_[vals[:-1], colors[:-1], vals[1:], colors[1:]]
 
         fmt = "%e %3d %3d %3d %e %3d %3d %3d"
 
-        np.savetxt(outpath, col_arr, fmt=fmt,
-                   header="# COLOR_MODEL = RGB",
-                   footer=footer, comments="")
+        body = "\n".join(fmt % tuple(row) for row in col_arr.tolist())
+
+        with open(outpath, 'w') as file:
+            file.write("# COLOR_MODEL = RGB\n" + body + "\n" + footer + "\n")
 
     def save_as_ct(self, outpath=None):
         """
@@ -569,19 +615,22 @@ class ColorMap:
         if outpath is None:
             outpath = os.path.join(self.dirpath, self._mpl_cm.name+'.cpt')
 
-        arr = np.zeros((255, 3), dtype=int)
-
         if isinstance(self._mpl_cm, col.ListedColormap):
-            for i in range(len(self._mpl_cm.colors)):
-                arr[i, :] = [int(self._mpl_cm.colors[i][0] * 255), int(self._mpl_cm.colors[i][1] * 255),
-                                          int(self._mpl_cm.colors[i][2] * 255)]
+            rgb = col.to_rgba_array(self._mpl_cm.colors)[:, :3]
         elif isinstance(self._mpl_cm, col.LinearSegmentedColormap):
-            colors = (self._mpl_cm(np.linspace(0., 1., 255))[:, :3] * 255).astype(int)
-            for i in range(len(colors)):
-                arr[i, :] = [int(colors[i][0]), int(colors[i][1]), int(colors[i][2])]
+            rgb = self._mpl_cm(np.linspace(0., 1., 255))[:, :3]
+        colors = np.rint(rgb * 255).astype(np.uint8)
+
+        # gdal color tables are padded to 255 entries
+        arr = np.zeros((max(255, len(colors)), 3), dtype=int)
+        arr[:len(colors)] = colors
 
         fmt = "%3d %3d %3d"
-        np.savetxt(outpath, arr, fmt=fmt)
+        buf = io.StringIO()
+        np.savetxt(buf, arr, fmt=fmt)
+
+        with open(outpath, 'w') as file:
+            file.write(buf.getvalue())
 
     def save_as_json(self, outpath=None):
         """
@@ -600,13 +649,12 @@ class ColorMap:
         cmap_dict['Name'] = self._mpl_cm.name
         rgb_points = []
         if isinstance(self._mpl_cm, col.ListedColormap):
-            for i in range(len(self._mpl_cm.colors)):
-                rgb_points.append((self._mpl_cm.colors[i][0], self._mpl_cm.colors[i][1],
-                                          self._mpl_cm.colors[i][2]))
+            # tolist also turns the colors of array backed colormaps (e.g. greyscale) into json serializable floats
+            rgb_points = col.to_rgba_array(self._mpl_cm.colors)[:, :3].tolist()
             cmap_dict["Type"] = "Listed"
         elif isinstance(self._mpl_cm, col.LinearSegmentedColormap):
-            segmnetdata = self._mpl_cm._segmentdata
-            rgb_points = [segmnetdata]
+            segmentdata = {key: seg.tolist() for key, seg in self._segment_arrays().items()}
+            rgb_points = [segmentdata]
             cmap_dict["Type"] = "Segmented"
         cmap_dict['RGBPoints'] = rgb_points
         cmap_list = []
@@ -644,4 +692,4 @@ class ColorMap:
         if isinstance(self._mpl_cm, col.LinearSegmentedColormap):
             return str(self._mpl_cm._segmentdata.values())
         elif isinstance(self._mpl_cm, col.ListedColormap):
-            return str(self._mpl_cm.colors[0]+self._mpl_cm.colors[-1])
\ No newline at end of file
+            return str(tuple(self._mpl_cm.colors[0]) + tuple(self._mpl_cm.colors[-1]))
\ No newline at end of file
@@ -1,11 +1,115 @@
 import numpy as np
-import colorsys
+from matplotlib.colors import hsv_to_rgb
 import os
 import json
+import mmap
+import contextlib
+import functools
 
-def cptfile2dict(filepath):
+# files larger than this (in bytes) are read through a memory map
+MMAP_THRESHOLD = 64 * 1024
+
+# header lines and background, foreground and NaN color lines of cpt files
+CPT_SKIP_PREFIXES = ('#', 'B', 'F', 'N')
+
+
+@contextlib.contextmanager
+def _open_mapped(filepath):
     """
-    Extracts a color dictionary and list for a colormap object from a .cpt file
+    Opens a file for binary reading, files larger than MMAP_THRESHOLD are memory mapped
+
+    Parameters
+    ----------
+    filepath: str
+        filepath of the file to be opened
+
+    Returns
+    -------
+    file or mmap object supporting read and readline
+    """
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+        else:
+            yield f
+
+
+def _cached_by_file_state(func):
+    """
+    Caches the result of a file reading function, keyed by absolute filepath, modification time and file size
+    so that edits on disk invalidate the cached entry. The cached result is shared between all callers and
+    must only hold immutable objects (e.g. read-only arrays and tuples).
+
+    Parameters
+    ----------
+    func: function
+        function taking the filepath as only argument
+
+    Returns
+    -------
+    wrapped function
+    """
+    @functools.lru_cache(maxsize=128)
+    def cached(filepath, mtime_ns, size):
+        return func(filepath)
+
+    @functools.wraps(func)
+    def wrapper(filepath):
+        if not os.path.exists(filepath):
+            raise ImportError("file ", filepath, "not found")
+        filepath = os.path.abspath(filepath)
+        stat = os.stat(filepath)
+        return cached(filepath, stat.st_mtime_ns, stat.st_size)
+
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+def _readonly(arr):
+    """
+    Marks an array as read-only so that it can be shared through the file cache
+
+    Parameters
+    ----------
+    arr: np.ndarray
+
+    Returns
+    -------
+    the same array, flagged as not writeable
+    """
+    arr.flags.writeable = False
+    return arr
+
+
+def _normalize_cpt(x, r, g, b, is_hsv):
+    """
+    Scales the positions of a cpt table to [0, 1] and converts its colors to RGB values between 0 and 1
+
+    Parameters
+    ----------
+    x, r, g, b: np.ndarray
+        positions and color channels as read from the cpt file
+    is_hsv: bool
+        if True the channels are hue (0-360), saturation and value, else RGB values between 0 and 255
+
+    Returns
+    -------
+    normalized positions, red, green and blue arrays
+    """
+    if is_hsv:
+        rgb = hsv_to_rgb(np.stack([r / 360., g, b], axis=1))
+    else:
+        rgb = np.stack([r, g, b], axis=1) / 255.
+    x_norm = (x - x[0]) / (x[-1] - x[0])
+
+    return x_norm, rgb[:, 0], rgb[:, 1], rgb[:, 2]
+
+
+@_cached_by_file_state
+def _read_cptfile(filepath):
+    """
+    Reads the normalized positions and RGB colors of a .cpt file
 
     Parameters
     ----------
@@ -14,81 +118,63 @@ def cptfile2dict(filepath):
 
     Returns
     -------
-    colormap name, list containing all colors, dictionary containing all colors
+    colormap name, read-only array of positions, read-only (N, 3) array of RGB colors
     """
-    if not os.path.exists(filepath):
-        raise ImportError("file ", filepath, "not found")
-    file = open(filepath)
     name = os.path.splitext(os.path.basename(filepath))[0]
-    lines = file.readlines()
-    file.close()
 
-    x = []
-    r = []
-    g = []
-    b = []
     color_model = "RGB"
-    for l in lines:
-        ls = l.split()
-        if l.strip():
-            if l[0] == "#":
-                if ls[-1] == "HSV":
+    rows = []
+    with _open_mapped(filepath) as file:
+        for l in iter(file.readline, b''):
+            l = l.decode().strip()
+            if not l or l.startswith(CPT_SKIP_PREFIXES):
+                if l.startswith("#") and l.split()[-1] == "HSV":
                     color_model = "HSV"
                 continue
-            if ls[0] == "B" or ls[0] == "F" or ls[0] == "N":
-                pass
-            else:
-                x.append(float(ls[0]))
-                r.append(float(ls[1]))
-                g.append(float(ls[2]))
-                b.append(float(ls[3]))
-                xtemp = float(ls[4])
-                rtemp = float(ls[5])
-                gtemp = float(ls[6])
-                btemp = float(ls[7])
-        else:
-            continue
-
-    x.append(xtemp)
-    r.append(rtemp)
-    g.append(gtemp)
-    b.append(btemp)
-
-    x = np.array(x, dtype=np.float64)
-    r = np.array(r, dtype=np.float64)
-    g = np.array(g, dtype=np.float64)
-    b = np.array(b, dtype=np.float64)
-    if color_model == "HSV":
-        for i in range(r.shape[0]):
-            rr, gg, bb = colorsys.hsv_to_rgb(r[i] / 360., g[i], b[i])
-            r[i] = rr
-            g[i] = gg
-            b[i] = bb
-    if color_model == "RGB":
-        r = r/255
-        g = g/255
-        b = b/255
-    x_norm = (x - x[0])/(x[-1] - x[0])
-
-    col_list = [(r[i], g[i], b[i]) for i in range(len(r))]
-
-    red = []
-    green = []
-    blue = []
-
-    for i in range(len(x)):
-        red.append([x_norm[i], r[i], r[i]])
-        green.append([x_norm[i], g[i], g[i]])
-        blue.append([x_norm[i], b[i], b[i]])
+            rows.append(l)
+
+    table = np.loadtxt(rows, usecols=(0, 1, 2, 3, 4, 5, 6, 7), dtype=np.float64, ndmin=2)
+    # every row holds the start and end of a segment, the end of the last segment closes the table
+    x = np.append(table[:, 0], table[-1, 4])
+    r = np.append(table[:, 1], table[-1, 5])
+    g = np.append(table[:, 2], table[-1, 6])
+    b = np.append(table[:, 3], table[-1, 7])
+
+    x_norm, r, g, b = _normalize_cpt(x, r, g, b, color_model == "HSV")
+
+    return name, _readonly(x_norm), _readonly(np.column_stack((r, g, b)))
+
+
+def cptfile2dict(filepath):
+    """
+    Extracts a color dictionary and list for a colormap object from a .cpt file
+
+    Parameters
+    ----------
+    filepath: str
+        filepath of a .cpt file including file extension
+
+    Returns
+    -------
+    colormap name, list containing all colors, dictionary containing all colors
+    """
+    name, x_norm, rgb = _read_cptfile(filepath)
+
+    col_list = list(map(tuple, rgb.tolist()))
+
+    red = np.column_stack((x_norm, rgb[:, 0], rgb[:, 0])).tolist()
+    green = np.column_stack((x_norm, rgb[:, 1], rgb[:, 1])).tolist()
+    blue = np.column_stack((x_norm, rgb[:, 2], rgb[:, 2])).tolist()
 
     color_dict = {"red": red, "green": green, "blue": blue}
 
     return name, col_list, color_dict
 
 
-def ctfile2list(filepath):
+@_cached_by_file_state
+def _read_ctfile(filepath):
     """
-    Extracts a color list and dictionary for a colormap object from a .ct file
+    Reads the RGB colors of a .ct file
 
     Parameters
     ----------
@@ -97,46 +183,41 @@ def ctfile2list(filepath):
 
     Returns
     -------
-    colormap name, list containing all colors, dictionary containing all colors
+    colormap name, read-only (N, 3) array of RGB colors
     """
-
-    if not os.path.exists(filepath):
-        raise ImportError("file ", filepath, "not found")
-    f = open(filepath)
     name = os.path.splitext(os.path.basename(filepath))[0]
 
-    lines = f.readlines()
-    f.close()
-    red = []
-    green = []
-    blue = []
+    with _open_mapped(filepath) as f:
+        arr = np.loadtxt((l.decode() for l in iter(f.readline, b'')), usecols=(0, 1, 2), dtype=np.float64,
+                         ndmin=2) / 255.
 
-    for l in lines:
-        ls = l.split()
-        if l.strip():
-            red.append(float(ls[0]))
-            green.append(float(ls[1]))
-            blue.append(float(ls[2]))
+    return name, _readonly(arr)
 
-        else:
-            continue
 
-    red = np.array(red, dtype=np.float64)
-    green = np.array(green, dtype=np.float64)
-    blue = np.array(blue, dtype=np.float64)
+def ctfile2list(filepath):
+    """
+    Extracts a color list and dictionary for a colormap object from a .ct file
 
-    red = red/255
-    green = green/255
-    blue = blue/255
+    Parameters
+    ----------
+    filepath: str
+        filepath of a .ct file including file extension
+
+    Returns
+    -------
+    colormap name, list containing all colors, dictionary containing all colors
+    """
+    name, arr = _read_ctfile(filepath)
 
-    col_list = [(red[i], green[i], blue[i]) for i in range(len(red))]
+    col_list = list(map(tuple, arr.tolist()))
 
     return name, col_list
 
 
-def json2list(filepath):
+@_cached_by_file_state
+def _read_jsonfile(filepath):
     """
-    Creates a color dictionary or list for a colormap object from a .json file
+    Reads the colors of a .json file
 
     Parameters
     ----------
@@ -145,11 +226,10 @@ def json2list(filepath):
 
     Returns
     -------
-    colormap name, dictionary or list containing all colors, gradient defining colormap type
+    colormap name, read-only (N, 3) array of colors or tuple of (channel, read-only segment array) pairs,
+    gradient defining colormap type
     """
-    if not os.path.exists(filepath):
-        raise ImportError("file ", filepath, "not found")
-    with open(filepath, "r") as fidin:
+    with _open_mapped(filepath) as fidin:
         cmap_dict = json.load(fidin)
         cmap_dict = cmap_dict[0]
         if 'Type' in cmap_dict:
@@ -160,18 +240,46 @@ def json2list(filepath):
         if 'Type' in cmap_dict:
             if cmap_dict['Type'] == 'Segmented':
                 gradient = True
-                colors = cmap_dict['RGBPoints'][0]
+                colors = tuple((key, _readonly(np.asarray(channel, dtype=np.float64)))
+                               for key, channel in cmap_dict['RGBPoints'][0].items())
             else:
-                rgb = cmap_dict['RGBPoints']
-                colors = [tuple(i) for i in rgb]
+                colors = _readonly(np.asarray(cmap_dict['RGBPoints'], dtype=np.float64))
 
         else:
-            colors = [cmap_dict['RGBPoints'][x:x + 3] for x in range(0, len(cmap_dict['RGBPoints']), 4)]
+            # RGBPoints are stored flat as x, r, g, b per point
+            pts = np.asarray(cmap_dict['RGBPoints'], dtype=np.float64)
+            colors = _readonly(pts.reshape(-1, 4)[:, 1:4])
         if cmap_dict.get('RGBPoints', None) is None:
             return None
 
         return name, colors, gradient
 
+
+def json2list(filepath):
+    """
+    Creates a color dictionary or list for a colormap object from a .json file
+
+    Parameters
+    ----------
+    filepath: str
+        filepath of a .json file including file extension
+
+    Returns
+    -------
+    colormap name, dictionary or list containing all colors, gradient defining colormap type
+    """
+    result = _read_jsonfile(filepath)
+    if result is None:
+        return None
+    name, colors, gradient = result
+
+    if gradient:
+        colors = {key: channel.tolist() for key, channel in colors}
+    else:
+        colors = list(map(tuple, colors.tolist()))
+
+    return name, colors, gradient
+
 def add_alpha(colors):
     """
     Add the default alpha value 1 to every color in a list or dictionary of colors
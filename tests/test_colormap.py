@@ -21,10 +21,13 @@ Tests for the ColorMap().
 import os
 import shutil
 import unittest
+from unittest import mock
 import random
+import numpy as np
 import matplotlib.pyplot as plt
 import colorcet as cc
-from colorella.colormap import ColorMap
+from colorella.colormap import ColorMap, get_user_colormaps
+from colorella.conversions import MMAP_THRESHOLD
 import matplotlib.colors as col
 import warnings
 
@@ -94,6 +97,28 @@ class TestColormap(unittest.TestCase):
         cmap = ColorMap('cl:{}'.format('Rainbow'))
         self.assertIsInstance(cmap, ColorMap)
 
+    def test_get_user_colormaps(self):
+        """
+        Tests listing the colormaps in the user colormap directory
+        """
+        cmaps = get_user_colormaps()
+        self.assertIn('Rainbow.json', cmaps)
+        for cm_file in cmaps:
+            self.assertIsInstance(ColorMap('cl:{}'.format(os.path.splitext(cm_file)[0])), ColorMap)
+
+    def test_get_user_colormaps_mixed(self):
+        """
+        Tests listing and loading .json, .cpt and .ct colormaps from the user colormap directory
+        """
+        cm_files = ['Rainbow.json', 'ETOPO1.cpt', 'sgrt_ct_cont_ssm.ct']
+        for cm_file in cm_files:
+            shutil.copy(os.path.join(self.data_path, cm_file), self.output_path)
+        with mock.patch('colorella.colormap.CM_DIRPATH', self.output_path):
+            self.assertListEqual(sorted(get_user_colormaps()), sorted(cm_files))
+            for cm_file in cm_files:
+                cmap = ColorMap('cl:{}'.format(os.path.splitext(cm_file)[0]))
+                self.assertIsInstance(cmap, ColorMap)
+
     def test_cmap_from_dict(self):
         """
         Tests creation of a ColorMap from a dictionary
@@ -115,6 +140,54 @@ class TestColormap(unittest.TestCase):
         ct_file = 'sgrt_ct_cont_ssm.ct'
         cmap = ColorMap.from_ctfile(os.path.join(self.data_path, ct_file), gradient=False)
         self.assertIsInstance(cmap, ColorMap)
+        self.assertEqual(cmap.to_list()[1], (170 / 255., 0., 30 / 255.))
+
+    def test_cmap_file_cache(self):
+        """
+        Tests that cached colormap files are reloaded after they changed on disk
+        """
+        ct_file = os.path.join(self.output_path, 'cache_test.ct')
+        with open(ct_file, 'w') as f:
+            f.write('255 0 0\n0 0 255\n')
+        cmap = ColorMap.from_ctfile(ct_file, gradient=False)
+        cmap.to_list()[0] = (0., 0., 0.)
+        self.assertEqual(ColorMap.from_ctfile(ct_file, gradient=False).to_list()[0], (1., 0., 0.))
+        # rewrite within the same modification time tick
+        mtime = os.stat(ct_file).st_mtime_ns
+        with open(ct_file, 'w') as f:
+            f.write('0 255 0\n0 0 255\n255 255 255\n')
+        os.utime(ct_file, ns=(mtime, mtime))
+        self.assertEqual(ColorMap.from_ctfile(ct_file, gradient=False).to_list()[0], (0., 1., 0.))
+        # relative and absolute paths resolve to the same file
+        rel_path = os.path.relpath(ct_file)
+        self.assertEqual(ColorMap.from_ctfile(rel_path, gradient=False).to_list(),
+                         ColorMap.from_ctfile(ct_file, gradient=False).to_list())
+
+    def test_cmap_from_large_files(self):
+        """
+        Tests reading memory mapped .cpt, .ct and .json files larger than MMAP_THRESHOLD
+        """
+        n = 8000
+        k = np.arange(n) % 256
+        colors = np.column_stack((k, 255 - k, k // 2))
+        x = np.arange(n + 1)
+
+        cpt_file = os.path.join(self.output_path, 'large.cpt')
+        with open(cpt_file, 'w') as f:
+            f.write('# COLOR_MODEL = RGB\n')
+            for i in range(n):
+                f.write('{} {} {} {} {} {} {} {}\n'.format(x[i], *colors[i], x[i + 1], *colors[i]))
+            f.write('B 0 0 0\nF 255 255 255\nN 128 128 128\n')
+        ct_file = os.path.join(self.output_path, 'large.ct')
+        np.savetxt(ct_file, colors, fmt='%3d')
+        json_file = os.path.join(self.output_path, 'large.json')
+        ColorMap.from_list((colors / 255.).tolist(), name='large').save_as_json(json_file)
+
+        for filepath in [cpt_file, ct_file, json_file]:
+            self.assertGreater(os.path.getsize(filepath), MMAP_THRESHOLD)
+        np.testing.assert_allclose(ColorMap.from_cptfile(cpt_file, gradient=False).to_list()[:n], colors / 255.)
+        np.testing.assert_allclose(ColorMap.from_ctfile(ct_file, gradient=False).to_list(), colors / 255.)
+        np.testing.assert_allclose(ColorMap.from_jsonfile(json_file).to_list(), colors / 255.)
 
     def test_cmap_from_cpt(self):
         """
@@ -124,6 +197,14 @@ class TestColormap(unittest.TestCase):
         cmap = ColorMap.from_cptfile(os.path.join(self.data_path, cpt_file), gradient=True)
         self.assertIsInstance(cmap, ColorMap)
 
+    def test_cmap_from_hsv_cpt(self):
+        """
+        Tests creation of a ColorMap from a cpt file in HSV color space
+        """
+        cpt_file = 'hsv_test.cpt'
+        cmap = ColorMap.from_cptfile(os.path.join(self.data_path, cpt_file), gradient=False)
+        np.testing.assert_allclose(cmap.to_list(), [(1., 0., 0.), (0., 1., 0.), (0.5, 0.5, 1.)])
+
     def test_cmap_from_json(self):
         """
         Tests creation of a ColorMap from a json file
@@ -131,6 +212,7 @@ class TestColormap(unittest.TestCase):
         json_file = 'Rainbow.json'
         cmap = ColorMap.from_jsonfile(os.path.join(self.data_path, json_file))
         self.assertIsInstance(cmap, ColorMap)
+        self.assertEqual(cmap.to_list()[0], (0.0, 0.0, 1.0))
 
     def test_listed2segmented(self):
         """
@@ -140,6 +222,16 @@ class TestColormap(unittest.TestCase):
         cmap = cmap.to_gradient()
         self.assertIsInstance(cmap._mpl_cm, col.LinearSegmentedColormap)
 
+    def test_listed2segmented_no_interpolation(self):
+        """
+        Tests conversion to a LinearSegmented ColorMap keeping the listed colors
+        """
+        clist = [(1., 0., 0.), (0., 1., 0.), (0., 0., 1.)]
+        cmap = ColorMap.from_list(clist)
+        cmap = cmap.to_gradient(N=len(cmap))
+        self.assertEqual(cmap._mpl_cm.N, len(clist))
+        np.testing.assert_allclose(cmap._mpl_cm(np.arange(len(clist)))[:, :3], clist)
+
     def test_save_as_cpt(self):
         """
         Tests save ColorMap as cpt file
@@ -155,6 +247,21 @@ class TestColormap(unittest.TestCase):
         cmap_read.show()
         self.assertIsInstance(cmap_read, ColorMap)
 
+    def test_save_as_cpt_footer(self):
+        """
+        Tests that the B and F colors of a saved cpt file match the first and last table colors
+        """
+        for name in ['jet', 'plasma']:
+            cmap = ColorMap('mpl:{}'.format(name))
+            output_path = os.path.join(self.output_path, 'cpt_footer_test.cpt')
+            cmap.save_as_cpt(output_path)
+            with open(output_path) as f:
+                lines = [l.split() for l in f if l.strip() and not l.startswith('#')]
+            table = [l for l in lines if l[0] not in ('B', 'F', 'N')]
+            footer = {l[0]: l[1:] for l in lines if l[0] in ('B', 'F', 'N')}
+            self.assertListEqual(footer['B'], table[0][1:4])
+            self.assertListEqual(footer['F'], table[-1][5:8])
+
     def test_save_as_ct(self):
         """
         Tests save ColorMap as ct file
@@ -170,6 +277,20 @@ class TestColormap(unittest.TestCase):
         cmap_read.show()
         self.assertIsInstance(cmap_read, ColorMap)
 
+    def test_save_as_ct_values(self):
+        """
+        Tests that Listed and LinearSegmented ColorMaps with the same colors are saved with the same ct values
+        """
+        clist = [(k / 255., (255 - k) / 255., (k // 2) / 255.) for k in range(255)]
+        outputs = []
+        for gradient in [False, True]:
+            cmap = ColorMap.from_list(clist, gradient=gradient, N=len(clist))
+            output_path = os.path.join(self.output_path, 'ct_values_test.ct')
+            cmap.save_as_ct(output_path)
+            outputs.append(np.loadtxt(output_path))
+        np.testing.assert_array_equal(outputs[0], np.rint(np.array(clist) * 255))
+        np.testing.assert_array_equal(outputs[0], outputs[1])
+
     def test_save_as_json(self):
         """
         Tests save ColorMap as json file
@@ -189,7 +310,23 @@ class TestColormap(unittest.TestCase):
         cmap = ColorMap('mpl:{}'.format(self.default_mpl_cm))
         cmap_grey = cmap.convert2greyscale()
         cmap_grey.show()
-        self.assertIsInstance(cmap_grey._mpl_cm, col.LinearSegmentedColormap)
+        self.assertIsInstance(cmap_grey._mpl_cm, col.ListedColormap)
+
+    def test_convert2greyscale_values(self):
+        """
+        Tests that the greyscale ColorMap holds the weighted luminance of the original colors
+        """
+        cmap = ColorMap('mpl:viridis')
+        lut = cmap._mpl_cm(np.arange(cmap._mpl_cm.N))
+        cmap_grey = cmap.convert2greyscale(inplace=False)
+        grey = np.asarray(cmap_grey._mpl_cm.colors)
+        np.testing.assert_array_equal(grey[:, 0], grey[:, 1])
+        np.testing.assert_array_equal(grey[:, 0], grey[:, 2])
+        np.testing.assert_allclose(grey[:, 0], lut[:, :3] @ [0.2126, 0.7152, 0.0722], rtol=1e-6)
+        np.testing.assert_array_equal(grey[:, 3], lut[:, 3])
+        output_path = os.path.join(self.output_path, 'grey_test.json')
+        cmap_grey.save_as_json(output_path)
+        np.testing.assert_allclose(ColorMap.from_jsonfile(output_path).to_list(), grey[:, :3])
 
     def test_to_matplotlib(self):
         """
@@ -207,6 +344,15 @@ class TestColormap(unittest.TestCase):
         cdict_out = cmap.to_dict()
         self.assertEqual(self.cdict, cdict_out)
 
+    def test_listed_to_dict(self):
+        """
+        Tests writing Listed ColorMap colors to dictionary
+        """
+        cmap = ColorMap.from_list(self.clist)
+        cdict_out = cmap.to_dict()
+        self.assertListEqual([c[0] for c in self.clist], cdict_out['R'][:len(self.clist)])
+        self.assertListEqual([c[2] for c in self.clist], cdict_out['B'][:len(self.clist)])
+
     def test_to_list(self):
         """
         Tests writing ColorMap colors to list
@@ -225,6 +371,50 @@ class TestColormap(unittest.TestCase):
         cmap = cmap_reverse.reverse(inplace=False)
         self.assertEqual(cmap._mpl_cm.colors, self.clist)
 
+    def test_reverse_segmented(self):
+        """
+        Tests reversing LinearSegmented ColorMap colors
+        """
+        cmap = ColorMap.from_dict(self.cdict)
+        cmap_reverse = cmap.reverse(inplace=False)
+        vals = np.linspace(0., 1., 50)
+        np.testing.assert_allclose(cmap_reverse._mpl_cm(vals), cmap._mpl_cm(vals[::-1]), atol=1e-6)
+        self.assertEqual(cmap_reverse.name, cmap.name + '_reversed')
+
+    def test_functional_segmentdata(self):
+        """
+        Tests reversing and saving a ColorMap whose channels are defined by functions
+        """
+        cmap = ColorMap('mpl:gnuplot')
+        vals = np.linspace(0., 1., 50)
+        cmap_reverse = cmap.reverse(inplace=False)
+        np.testing.assert_allclose(cmap_reverse._mpl_cm(vals), cmap._mpl_cm(vals[::-1]), atol=1e-2)
+        output_path = os.path.join(self.output_path, 'gnuplot_test.json')
+        cmap.save_as_json(output_path)
+        cmap_read = ColorMap.from_jsonfile(output_path)
+        np.testing.assert_allclose(cmap_read._mpl_cm(vals), cmap._mpl_cm(vals), atol=1e-2)
+
+    def test_segment_arrays_cache(self):
+        """
+        Tests that the cached segment arrays are rebuilt after the colormap is replaced
+        """
+        cmap = ColorMap.from_dict(self.cdict)
+        seg = cmap._segment_arrays()
+        self.assertIs(seg, cmap._segment_arrays())
+        self.assertFalse(seg['red'].flags.writeable)
+        cmap.reverse(inplace=True)
+        np.testing.assert_allclose(cmap._segment_arrays()['red'][:, 0], 1. - seg['red'][::-1, 0])
+
+    def test_reverse_discontinuity(self):
+        """
+        Tests reversing a LinearSegmented ColorMap with a discontinuity
+        """
+        channel = [(0., 0., 0.), (0.5, 0.2, 0.4), (0.5, 0.6, 0.8), (1., 1., 1.)]
+        cmap = ColorMap.from_dict({'red': channel, 'green': channel, 'blue': channel})
+        cmap_reverse = cmap.reverse(inplace=False)
+        self.assertListEqual(cmap_reverse.to_dict()['red'],
+                             [[0., 1., 1.], [0.5, 0.8, 0.6], [0.5, 0.4, 0.2], [1., 0., 0.]])
+
     def test_view(self):
         """
         Tests ploting the ColorMap